@@ -1,98 +1,200 @@
 """Run the app"""
 import os
+import hashlib
 from datetime import datetime
 
-from data import get_run_data, get_summary_stats, load_run_data_from_file
-from plot import generate_plots, generate_summary
+from flask import Flask, Response, render_template_string, jsonify, request, send_file, stream_with_context
 
-from flask import Flask, render_template_string, jsonify, request
-import plotly.io as pio
-# Set plotly to render in browser
-pio.renderers.default = "browser"
+from assets import (
+    COMPRESSIBLE_MIMETYPES, IMMUTABLE_CACHE_CONTROL, MIN_COMPRESS_SIZE,
+    available_encodings, compress, compress_stream, compress_variants, find_static_variant,
+    get_plotly_js_url
+)
+from cycles import CYCLE_OPTIONS
 
-app = Flask(__name__)
+# data (pandas, NumPy) and plot (Plotly) are imported inside the routes that use them,
+# so a (re)started process can serve its first request without paying for them up front.
+# pylint: disable=C0415
 
-CYCLE_OPTIONS = {
-    "2025 Indy Marathon": {"start_date": datetime(2025, 7, 21), "end_date": datetime(2025, 11, 8)},
-    "2025 NYC/Brooklyn Half Marathon": {"start_date": datetime(2025, 2, 2), "end_date": datetime(2025, 5, 17)},
-    "2024 Brooklyn Half Marathon": {"start_date": datetime(2024, 1, 1), "end_date": datetime(2024, 5, 18)},
-    "2022 Twin-Cities Marathon": {"start_date": datetime(2022, 5, 16), "end_date": datetime(2022, 10, 2)},
-    "2021 CIM Marathon": {"start_date": datetime(2021, 6, 21), "end_date": datetime(2021, 10, 2)},
-    "2020 NYC Virtual Marathon": {"start_date": datetime(2020, 8, 9), "end_date": datetime(2020, 10, 17)},
-    "2019 Twin-Cities Marathon": {"start_date": datetime(2019, 7, 29), "end_date": datetime(2019, 10, 6)},
-}
+app = Flask(__name__)
 
 CYCLE_OPTIONS_LIST = [(key, key) for key in CYCLE_OPTIONS]
 # Dropdown: YTD first (default), then all cycles
 PLOT_OPTIONS_LIST = [("YTD", "YTD")] + CYCLE_OPTIONS_LIST
 DEFAULT_PLOT_KEY = "YTD"
+DEFAULT_PERCENTILES = (25, 50, 75)
+# Default page size for /api/runs
+RUN_QUERY_PAGE_SIZE = 1000
+
+# Pre-rendered cycle pages: (query, data version) -> (compressed variants, etag), oldest evicted first
+PAGE_CACHE_SIZE = 32
+_page_cache = {}
+
+def accepted_encodings():
+    """Encodings this process can produce that the client accepts, in server preference order."""
+    return [encoding for encoding in available_encodings() if request.accept_encodings.quality(encoding) > 0]
+
+def precompressed_response(variants, etag, mimetype):
+    """Serve the best precompressed variant, answering 304 when the client's copy is current."""
+    encoding = next(iter(accepted_encodings()), "identity")
+    response = Response(variants[encoding], mimetype=mimetype)
+    if encoding != "identity":
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # Revalidate on each visit; unchanged pages cost a 304 instead of the full body
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(f"{etag}-{encoding}")
+    return response.make_conditional(request)
+
+@app.route('/static/dist/<path:name>')
+def static_dist(name):
+    """Serve fingerprinted static files, preferring their precompressed variants."""
+    found = find_static_variant(name, accepted_encodings())
+    if found is None:
+        return jsonify({'status': 'error', 'message': f"Not found: {name}"}), 404
+    path, encoding = found
+    mimetype = 'text/javascript' if name.endswith('.js') else None
+    response = send_file(path, mimetype=mimetype, conditional=True)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress HTML, JSON, NDJSON and CSV responses that are not already encoded."""
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.status_code != 200
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = next(iter(accepted_encodings()), None)
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        # Compress chunk by chunk so streamed exports keep constant memory
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < MIN_COMPRESS_SIZE:
+            return response
+        response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def parse_number_list(text, pace=False):
+    """Parse '0,3,6,inf' (or MM:SS values when pace) into floats. Raises ValueError."""
+    from data import time_to_decimal
+    return [time_to_decimal(v) if pace and ":" in v else float(v) for v in text.split(",") if v.strip()]
+
+def parse_distribution_args(args):
+    """Read bin overrides (bins_<metric>=...), percentiles and faster_than from the query.
+
+    Malformed values are ignored and fall back to the defaults, like an unknown cycle.
+    """
+    from plot import PLOT_VARIABLES
+    bins = {}
+    for var in PLOT_VARIABLES:
+        try:
+            edges = parse_number_list(args.get(f"bins_{var}", ""), pace=var == "pace")
+        except ValueError:
+            continue
+        if len(edges) >= 2 and all(lo < hi for lo, hi in zip(edges[:-1], edges[1:])):
+            bins[var] = edges
+    try:
+        percentiles = parse_number_list(args.get("percentiles", ""))
+    except ValueError:
+        percentiles = []
+    percentiles = [q for q in percentiles if 0 <= q <= 100] or list(DEFAULT_PERCENTILES)
+    try:
+        faster_than = parse_number_list(args.get("faster_than", ""), pace=True)[0]
+    except (ValueError, IndexError):
+        faster_than = None
+    return bins, percentiles, faster_than
 
 @app.route('/')
 def home():
     """Generate the plot and summary HTML"""
+    import plotly.io as pio
+    from data import get_historical_run_frame, get_metric_index, get_run_data, get_summary_stats, slice_by_date
+    from plot import generate_distribution_summary, generate_plots, generate_records_summary, generate_summary
+    from records import ALL_TIME_SCOPE, RECORDS_PATH, get_personal_records, load_records
+
     selected_cycle = request.args.get('cycle', DEFAULT_PLOT_KEY)
     valid_plot_keys = {"YTD"} | set(CYCLE_OPTIONS)
     if selected_cycle not in valid_plot_keys:
         selected_cycle = DEFAULT_PLOT_KEY
 
-    # YTD stats: read from API (for YTD card and for default plot)
-    ytd_start = datetime(datetime.now().year, 1, 1)
-    run_df_ytd = get_run_data(read_date=ytd_start)
-    if run_df_ytd.empty:
-        ytd_summary_html = '<div class="metric">No YTD data from API.</div>'
-    else:
-        ytd_summary_html = generate_summary(get_summary_stats(run_df_ytd))
-
-    # Cycle data: read from static file (no API call)
-    run_df = load_run_data_from_file()
-    if not run_df.empty:
-        run_df = get_run_data(df=run_df)
-
-    cycle_data_map = {}
-    empty_df = run_df.iloc[0:0].copy() if not run_df.empty else run_df.copy()
-
-    for cycle_key, opts in CYCLE_OPTIONS.items():
-        start_d, end_d = opts["start_date"], opts["end_date"]
-        if run_df.empty:
-            run_df_cycle = run_df.copy()
-        else:
-            run_df_cycle = run_df[
-                (run_df["start_date_local"].dt.date >= start_d.date()) &
-                (run_df["start_date_local"].dt.date <= end_d.date())
-            ].copy()
-        cycle_data_map[cycle_key] = run_df_cycle
-
-    # Distribution plot: YTD (from API) or selected cycle (from file)
+    page_key = None
+    records_version = os.stat(RECORDS_PATH).st_mtime_ns if os.path.isfile(RECORDS_PATH) else None
     if selected_cycle == "YTD":
-        run_df_selected = run_df_ytd
+        # YTD: read from API on every request
+        run_df_selected = get_run_data(read_date=datetime(datetime.now().year, 1, 1))
         selected_cycle_display = f"{datetime.now().year} YTD"
+        last_updated = datetime.now()
     else:
-        run_df_selected = cycle_data_map.get(selected_cycle, empty_df)
+        # Cycle data: read from static file (no API call)
+        run_df = get_historical_run_frame()
+        opts = CYCLE_OPTIONS[selected_cycle]
+        run_df_selected = slice_by_date(run_df, opts["start_date"], opts["end_date"])
         selected_cycle_display = selected_cycle
+        # The page depends only on the query and the data version, so it is pre-rendered once
+        data_version = run_df.attrs.get("data_version")
+        last_updated = datetime.fromtimestamp(data_version / 1e9) if data_version else datetime.now()
+        if data_version:
+            page_key = (tuple(sorted(request.args.items(multi=True))), data_version, records_version)
+            if page_key in _page_cache:
+                return precompressed_response(*_page_cache[page_key], mimetype='text/html')
 
-    fig = generate_plots(run_df_selected)
-    plot_html = pio.to_html(fig, full_html=False, include_plotlyjs='cdn') # type: ignore
+    # Sorted metric index: cached per cycle and data version, rebuilt for fresh YTD reads
+    bins, percentiles, faster_than = parse_distribution_args(request.args)
+    metric_index = None if run_df_selected.empty else get_metric_index(run_df_selected, key=selected_cycle)
+    fig = generate_plots(run_df_selected, bins=bins, metric_index=metric_index)
+    # plotly.js is loaded once from the page head (self-hosted, long-cached)
+    plot_html = pio.to_html(fig, full_html=False, include_plotlyjs=False) # type: ignore
 
     # Summary stats for the selected period (YTD or cycle)
     if run_df_selected.empty:
         selected_summary_html = '<div class="metric">No data for this period.</div>'
+        distribution_html = selected_summary_html
     else:
         selected_summary_html = generate_summary(get_summary_stats(run_df_selected))
+        distribution_html = generate_distribution_summary(metric_index, percentiles, faster_than)
+
+    # Personal records: constant-time lookups in the index kept up to date by the collector
+    records = load_records()
+    records_scope = str(datetime.now().year) if selected_cycle == "YTD" else selected_cycle
+    records_html = generate_records_summary(
+        get_personal_records(records, records_scope), get_personal_records(records, ALL_TIME_SCOPE),
+        pending=records.get("pending", 0)
+    )
 
     # Read the main HTML template
     with open('templates/index.html', 'r', encoding='utf-8') as f:
         template_content = f.read()
 
     # Render the template with the generated HTML
-    return render_template_string(
+    html = render_template_string(
         template_content,
         plot_html=plot_html,
-        last_updated=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        plotly_js_url=get_plotly_js_url(),
+        last_updated=last_updated.strftime("%Y-%m-%d %H:%M:%S"),
         cycle_options=PLOT_OPTIONS_LIST,
         selected_cycle=selected_cycle,
         selected_cycle_display=selected_cycle_display,
         selected_summary_html=selected_summary_html,
+        distribution_html=distribution_html,
+        records_html=records_html,
     )
+    if page_key is None:
+        return html
+
+    body = html.encode('utf-8')
+    if len(_page_cache) >= PAGE_CACHE_SIZE:
+        _page_cache.pop(next(iter(_page_cache)))
+    _page_cache[page_key] = (compress_variants(body), hashlib.sha256(body).hexdigest()[:16])
+    return precompressed_response(*_page_cache[page_key], mimetype='text/html')
 
 @app.route('/refresh')
 def refresh():
@@ -103,6 +205,8 @@ def refresh():
 @app.route('/api/status')
 def status():
     """API endpoint: YTD run count and latest activity from API."""
+    from data import get_run_data
+
     try:
         ytd_start = datetime(datetime.now().year, 1, 1)
         run_df = get_run_data(read_date=ytd_start)
@@ -115,6 +219,59 @@ def status():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+@app.route('/api/runs')
+def runs():
+    """API endpoint: stream runs from the local store as NDJSON or CSV, one page per request.
+
+    Query parameters: start/end (YYYY-MM-DD, inclusive), sport_type, columns
+    (comma-separated), format (ndjson or csv), limit (0 for no paging) and cursor
+    (from the X-Next-Cursor header of the previous page).
+    """
+    from data import get_historical_run_frame, iter_run_chunks, page_runs, slice_by_date
+
+    args = request.args
+    try:
+        start_date = datetime.strptime(args['start'], "%Y-%m-%d") if args.get('start') else None
+        end_date = datetime.strptime(args['end'], "%Y-%m-%d") if args.get('end') else None
+        limit = int(args.get('limit', RUN_QUERY_PAGE_SIZE))
+        if limit < 0:
+            raise ValueError("limit must be non-negative")
+        export_format = args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            raise ValueError(f"Unsupported format: {export_format}")
+
+        run_df = get_historical_run_frame()
+        columns = [c for c in args.get('columns', '').split(',') if c] or None
+        unknown = sorted(set(columns or []) - set(run_df.columns)) if not run_df.empty else []
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+        sport_type = args.get('sport_type') or None
+        run_df, next_cursor = page_runs(
+            slice_by_date(run_df, start_date, end_date),
+            cursor=args.get('cursor'), sport_type=sport_type, limit=limit
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    def generate():
+        header = export_format == 'csv'
+        for chunk in iter_run_chunks(run_df, sport_type=sport_type, columns=columns):
+            if export_format == 'csv':
+                yield chunk.to_csv(index=False, header=header)
+                header = False
+            else:
+                yield chunk.to_json(orient='records', lines=True, date_format='iso').rstrip("\n") + "\n"
+        if header and len(run_df.columns):
+            # No rows (empty range or none of the sport type): still send the projected header
+            yield run_df.iloc[:0][columns or run_df.columns].to_csv(index=False)
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
 if __name__ == '__main__':
     host = os.environ.get('FLASK_HOST', '127.0.0.1')
     port = int(os.environ.get('FLASK_PORT', 5000))
@@ -0,0 +1,118 @@
+"""Self-hosted static assets and response compression for the dashboard"""
+
+import os
+import gzip
+import zlib
+import hashlib
+import threading
+import importlib.resources
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Fingerprinted static files and their precompressed .gz/.br variants (next to this module,
+# not the working directory, since Flask's send_file resolves relative paths against the app root)
+STATIC_DIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "dist")
+STATIC_URL_PREFIX = "/static/dist/"
+# Fingerprinted URLs never change content, so clients may cache them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Encodings in server preference order, with their file suffixes
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 500
+COMPRESSIBLE_MIMETYPES = {"text/html", "application/json", "application/x-ndjson", "text/csv"}
+
+_plotly_js_name = None
+_build_lock = threading.Lock()
+
+def compress(body, encoding, precompress=False):
+    """Compress bytes with gzip or br. precompress trades CPU for size on cached content."""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if precompress else 4)
+    return gzip.compress(body, compresslevel=9 if precompress else 6)
+
+def compress_stream(chunks, encoding):
+    """Compress an iterable of str/bytes chunks incrementally, yielding compressed bytes."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=4)
+        process, finish = compressor.process, compressor.finish
+    else:
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        process, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = process(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield finish()
+
+def available_encodings():
+    """Encodings this process can produce, in preference order."""
+    return [encoding for encoding in ENCODINGS if encoding != "br" or brotli is not None]
+
+def compress_variants(body):
+    """Precompressed variants of body, keyed by encoding ("identity" included)."""
+    variants = {"identity": body}
+    for encoding in available_encodings():
+        variants[encoding] = compress(body, encoding, precompress=True)
+    return variants
+
+def get_plotly_js_url(brotli_variant=False):
+    """URL of the local, fingerprinted plotly.js bundled with the installed plotly package.
+
+    The first call writes static/dist/plotly-<hash>.min.js and its gzip variant. The
+    brotli variant (seconds of CPU at max quality) is only built with brotli_variant,
+    as the `python assets.py` prebuild does; the app serves it once it exists.
+    """
+    global _plotly_js_name  # pylint: disable=W0603
+    with _build_lock:
+        if _plotly_js_name is None or brotli_variant:
+            body = (importlib.resources.files("plotly") / "package_data" / "plotly.min.js").read_bytes()
+            name = f"plotly-{hashlib.sha256(body).hexdigest()[:12]}.min.js"
+            path = os.path.join(STATIC_DIST_DIR, name)
+            _write_if_missing(path, lambda: body)
+            _write_if_missing(path + ENCODINGS["gzip"], lambda: compress(body, "gzip", precompress=True))
+            if brotli_variant and brotli is not None:
+                _write_if_missing(path + ENCODINGS["br"], lambda: compress(body, "br", precompress=True))
+            _plotly_js_name = name
+    return STATIC_URL_PREFIX + _plotly_js_name
+
+def _write_if_missing(path, make_body):
+    """Write make_body() to path atomically unless the file already exists.
+
+    The body is computed before the temporary file is opened, and the temporary file
+    is removed if writing fails, so no partial files are left behind.
+    """
+    if os.path.isfile(path):
+        return
+    body = make_body()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def find_static_variant(name, accepted):
+    """Return (path, encoding) of the best precompressed file for name, or None if unknown.
+
+    accepted is the list of encodings the client accepts, in server preference order
+    (as returned by app.accepted_encodings); the first one with a file on disk wins.
+    """
+    path = os.path.join(STATIC_DIST_DIR, os.path.basename(name))
+    if not os.path.isfile(path):
+        return None
+    for encoding in accepted:
+        if encoding in ENCODINGS and os.path.isfile(path + ENCODINGS[encoding]):
+            return path + ENCODINGS[encoding], encoding
+    return path, None
+
+if __name__ == "__main__":
+    # Prebuild the static assets, brotli included (e.g. in a deploy step), so no request waits on them
+    print(get_plotly_js_url(brotli_variant=True))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the web app and data collector processes
+Measures, in fresh interpreters (as run_agent restarts them), the import time of
+app.py and data_collector.py, time to first /api/runs response, and time to first sync
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Each snippet runs in a fresh interpreter (cwd: a scratch dir with a synthetic store)
+# and prints the seconds elapsed since its first line.
+SCENARIOS = {
+    "app import": """
+import app
+""",
+    "app first request": """
+import app
+response = app.app.test_client().get('/api/runs?limit=1')
+assert response.status_code == 200, response.status_code
+response.get_data()
+""",
+    "collector import": """
+import data_collector
+""",
+    "collector first sync": """
+import data_collector, store, records
+store.get_activities = lambda **kwargs: json.load(open('batch.json', encoding='utf-8'))
+records.get_activity = lambda activity_id: {"best_efforts": [{"name": "5K", "elapsed_time": 1500}]}
+assert data_collector.collect_and_save_data()
+""",
+}
+
+def make_activities(count, start=datetime(2015, 1, 1, 7), first_id=10_000_000_000):
+    """Synthetic raw activities shaped like the Strava API's summary activities."""
+    activities = []
+    for i in range(count):
+        activity_id = first_id + i
+        activities.append({
+            "id": activity_id, "type": "Run", "sport_type": "Run", "name": "Morning Run",
+            "visibility": "everyone",
+            "start_date_local": (start + timedelta(hours=9 * i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "distance": 8000.0 + i % 5000, "moving_time": 2400 + i % 1800, "elapsed_time": 2600 + i % 1800,
+            "average_speed": 3.1, "average_cadence": 86.0, "total_elevation_gain": 40.0,
+            "elev_high": 38.0, "elev_low": 12.0, "average_heartrate": 150.0, "max_heartrate": 175.0,
+            "average_watts": 165.0, "max_watts": 330.0, "weighted_average_watts": 166.0, "kilojoules": 470.0,
+            "map": {"id": f"a{activity_id}", "summary_polyline": "_}{wFfbqbMb@b@DN@Zc@|B[t@Ib@KTm@NoAf@MR", "resource_state": 2},
+        })
+    return activities
+
+def run_scenario(code, workdir):
+    """Run a snippet in a fresh interpreter and return (in-process seconds, wall seconds)."""
+    program = (
+        "import time; _t0 = time.perf_counter()\n"
+        f"import sys, json; sys.path.insert(0, {REPO_DIR!r})\n"
+        f"{code}\n"
+        "print(time.perf_counter() - _t0)\n"
+    )
+    wall_start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", program], cwd=workdir, capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - wall_start
+    return float(result.stdout.strip().splitlines()[-1]), wall
+
+def main():
+    """Run each scenario and report median timings"""
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per scenario (default: 5)")
+    parser.add_argument("--activities", type=int, default=2000, help="Activities in the synthetic store (default: 2000)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.makedirs(os.path.join(workdir, "data"))
+        activities = make_activities(args.activities)
+        with open(os.path.join(workdir, "data", "strava_activities.json"), "w", encoding="utf-8") as f:
+            json.dump(activities, f)
+        # The sync re-delivers the last 30 activities plus 10 new ones
+        with open(os.path.join(workdir, "batch.json"), "w", encoding="utf-8") as f:
+            json.dump(activities[-30:] + make_activities(10, start=datetime.now(), first_id=20_000_000_000), f)
+        store_path = os.path.join(workdir, "data", "strava_activities.json")
+        with open(store_path, encoding="utf-8") as f:
+            pristine_store = f.read()
+
+        print(f"{'scenario':<22}{'in-process (s)':>16}{'wall (s)':>12}")
+        for name, code in SCENARIOS.items():
+            timings = []
+            for _ in range(args.runs):
+                with open(store_path, "w", encoding="utf-8") as f:
+                    f.write(pristine_store)
+                if os.path.isfile(os.path.join(workdir, "data", "strava_records.json")):
+                    os.remove(os.path.join(workdir, "data", "strava_records.json"))
+                timings.append(run_scenario(code, workdir))
+            in_process = statistics.median(t[0] for t in timings)
+            wall = statistics.median(t[1] for t in timings)
+            print(f"{name:<22}{in_process:>16.3f}{wall:>12.3f}")
+
+if __name__ == "__main__":
+    main()
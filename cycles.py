@@ -0,0 +1,13 @@
+"""Training cycles shown on the dashboard (kept free of heavy imports)"""
+
+from datetime import datetime
+
+CYCLE_OPTIONS = {
+    "2025 Indy Marathon": {"start_date": datetime(2025, 7, 21), "end_date": datetime(2025, 11, 8)},
+    "2025 NYC/Brooklyn Half Marathon": {"start_date": datetime(2025, 2, 2), "end_date": datetime(2025, 5, 17)},
+    "2024 Brooklyn Half Marathon": {"start_date": datetime(2024, 1, 1), "end_date": datetime(2024, 5, 18)},
+    "2022 Twin-Cities Marathon": {"start_date": datetime(2022, 5, 16), "end_date": datetime(2022, 10, 2)},
+    "2021 CIM Marathon": {"start_date": datetime(2021, 6, 21), "end_date": datetime(2021, 10, 2)},
+    "2020 NYC Virtual Marathon": {"start_date": datetime(2020, 8, 9), "end_date": datetime(2020, 10, 17)},
+    "2019 Twin-Cities Marathon": {"start_date": datetime(2019, 7, 29), "end_date": datetime(2019, 10, 6)},
+}
@@ -1,14 +1,32 @@
 """Process Strava data"""
 
+import base64
 import math
-import json
 import os
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 from strava import get_activities
+from store import HISTORICAL_RUN_DATA_PATH, fetch_all_historical_data_and_save, load_activities  # pylint: disable=W0611
 
-# Static file for historical run data (used by cycle distribution plots)
-HISTORICAL_RUN_DATA_PATH = os.path.join("data", "strava_activities.json")
+# String columns stored as categoricals when their values repeat enough
+CATEGORICAL_COLUMNS = ["sport_type", "name", "visibility", "pace"]
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+# Float columns that feed totals and exports stay float64; other floats are stored as float32
+FLOAT64_COLUMNS = ["distance", "distance_mile", "moving_time_minute", "total_elevation_gain_ft"]
+
+# Rows per chunk when streaming query results
+RUN_QUERY_CHUNK_SIZE = 1000
+
+# Processed historical run frame, keyed by path: (file mtime, run_df)
+_run_frame_cache = {}
+
+# Metrics kept as sorted arrays for distribution queries, and their cache: key -> (data version, index)
+INDEXED_METRICS = [
+    "distance_mile", "moving_time_minute", "pace",
+    "total_elevation_gain_ft", "average_heartrate", "average_watts"
+]
+_metric_index_cache = {}
 
 # HELPER FUNCTIONS
 def decimal_to_time(decimal_time):
@@ -26,6 +44,14 @@ def time_to_decimal(time_str):
     minutes, seconds = map(int, time_str.split(":"))
     return minutes + seconds / 60
 
+def pace_to_decimal(pace):
+    """Convert a pace Series (MM:SS strings, plain or categorical) to decimal minutes."""
+    if isinstance(pace.dtype, pd.CategoricalDtype):
+        # Convert each distinct pace once, then broadcast through the category codes
+        decimals = np.array([time_to_decimal(c) for c in pace.cat.categories] + [float("nan")])
+        return pd.Series(decimals[pace.cat.codes.to_numpy()], index=pace.index)
+    return pace.apply(time_to_decimal).astype(float)
+
 def get_data(read_date=None):
     """Get activity data from Strava API from read_date onward."""
     if read_date is None:
@@ -47,19 +73,21 @@ def load_run_data_from_file(filepath=None):
     run_df["start_date_local"] = pd.to_datetime(run_df["start_date_local"])
     return run_df
 
-def fetch_all_historical_data_and_save(filepath=None):
-    """Fetch all run data from API and save to static CSV. Use for initial/periodic full sync."""
+def get_historical_run_frame(filepath=None):
+    """Return the processed run frame for the static JSON, rebuilt only when the file changes."""
     path = filepath or HISTORICAL_RUN_DATA_PATH
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    # Request activities from year 2000 onward (covers all Strava history)
-    read_date = datetime(2026, 1, 1)
-    activities = get_activities(before=read_date.timestamp())
-
-    with open(file=path, mode='w', encoding='utf-8') as f:
-        json.dump(activities, f, indent=2)
-    print(f"Saved {len(activities)} activities to {path}")
-    return activities
-
+    if not os.path.isfile(path):
+        return pd.DataFrame()
+    version = os.stat(path).st_mtime_ns
+    cached = _run_frame_cache.get(path)
+    if cached is None or cached[0] != version:
+        run_df = load_run_data_from_file(path)
+        if not run_df.empty:
+            run_df = get_run_data(df=run_df)
+        # Slices of this frame carry the version, so indexes built on them can be cached
+        run_df.attrs["data_version"] = version
+        _run_frame_cache[path] = (version, run_df)
+    return _run_frame_cache[path][1]
 
 def get_run_data(df: pd.DataFrame=None, read_date=None):
     """Get run data from API from read_date onward."""
@@ -76,8 +104,12 @@ def get_run_data(df: pd.DataFrame=None, read_date=None):
         "average_heartrate", "max_heartrate", "average_watts", "max_watts",
         "weighted_average_watts", "kilojoules"
     ]
+    # Polylines are not kept in the run frame; they stay in the raw activity store
+    map_df = map_df.drop(columns="summary_polyline", errors="ignore")
     run_df = pd.merge(pd.DataFrame(df[df["type"]=="Run"][cols]), map_df, on="id", how="left")
     run_df["start_date_local"] = pd.to_datetime(run_df["start_date_local"])
+    # Keep rows in (date, id) order so date ranges and cursors resolve by binary search
+    run_df = run_df.sort_values(["start_date_local", "id"], ignore_index=True)
     run_df['distance_mile'] = run_df['distance'] / 1609.34
     run_df['moving_time_minute'] = run_df['moving_time'] / 60
     run_df['pace'] = run_df['moving_time_minute'] / run_df['distance_mile']
@@ -86,7 +118,149 @@ def get_run_data(df: pd.DataFrame=None, read_date=None):
     run_df["week"] = pd.to_datetime(run_df["start_date_local"]).dt.isocalendar().week
     run_df["weekly_milages_cumsum"] = run_df.groupby("week")["distance_mile"].cumsum().round(2)
 
-    return run_df
+    return compact_run_frame(run_df)
+
+def compact_run_frame(run_df):
+    """Downcast numeric columns to the smallest safe dtype and categorize repeated strings."""
+    for col in run_df.columns:
+        series = run_df[col]
+        if col in CATEGORICAL_COLUMNS and series.dtype != "category":
+            if series.nunique() <= max(1, len(series) * CATEGORICAL_MAX_UNIQUE_RATIO):
+                run_df[col] = series.astype("category")
+        elif pd.api.types.is_bool_dtype(series):
+            continue
+        elif pd.api.types.is_integer_dtype(series) and not series.hasnans:
+            run_df[col] = pd.to_numeric(series.astype("int64"), downcast="integer")
+        elif pd.api.types.is_float_dtype(series) and col not in FLOAT64_COLUMNS:
+            run_df[col] = series.astype("float32")
+    # Columns left as-is can still be views into the wide pre-downcast float block;
+    # a deep copy releases it
+    return run_df.copy()
+
+def slice_by_date(run_df, start_date=None, end_date=None):
+    """Return the runs dated within [start_date, end_date] (whole days, inclusive).
+
+    run_df must be sorted by start_date_local, as returned by get_run_data; the
+    bounds are found by binary search and the result is a positional slice, not a copy.
+    """
+    if run_df.empty:
+        return run_df
+    dates = run_df["start_date_local"]
+    lo, hi = 0, len(run_df)
+    if start_date is not None:
+        lo = dates.searchsorted(_day_start(start_date, dates.dt.tz), side="left")
+    if end_date is not None:
+        hi = dates.searchsorted(_day_start(end_date + timedelta(days=1), dates.dt.tz), side="left")
+    return run_df.iloc[lo:hi]
+
+def _day_start(day, tz):
+    """Midnight of the given day as a Timestamp comparable with a column in tz."""
+    stamp = pd.Timestamp(day.date() if isinstance(day, datetime) else day)
+    return stamp.tz_localize(tz) if tz is not None else stamp
+
+def encode_run_cursor(run):
+    """Encode a run row's (start_date_local, id) as an opaque pagination cursor."""
+    key = f"{run['start_date_local'].isoformat()}|{int(run['id'])}"
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+def decode_run_cursor(cursor):
+    """Decode a cursor from encode_run_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        start, run_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return pd.Timestamp(start), int(run_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def page_runs(run_df, cursor=None, sport_type=None, limit=None):
+    """Narrow a date-sorted run view to one page of results.
+
+    Returns (page_df, next_cursor). page_df is a positional slice that may still hold
+    rows of other sport types; filter them while streaming with iter_run_chunks.
+    next_cursor is None once the view is exhausted. A limit of None or 0 means no paging.
+    """
+    lo, hi = 0, len(run_df)
+    if cursor and hi:
+        start, run_id = decode_run_cursor(cursor)
+        dates = run_df["start_date_local"]
+        lo = dates.searchsorted(start, side="left")
+        end_of_day = dates.searchsorted(start, side="right")
+        lo += run_df["id"].iloc[lo:end_of_day].searchsorted(run_id, side="right")
+    if not limit:
+        return run_df.iloc[lo:hi], None
+
+    # Count matches chunk by chunk until the page is full
+    end, found = lo, 0
+    while end < hi and found < limit:
+        chunk = run_df.iloc[end:min(end + RUN_QUERY_CHUNK_SIZE, hi)]
+        matches = (chunk["sport_type"] == sport_type).to_numpy() if sport_type else np.ones(len(chunk), bool)
+        if found + matches.sum() < limit:
+            found += matches.sum()
+            end += len(chunk)
+        else:
+            end += int(np.flatnonzero(matches)[limit - found - 1]) + 1
+            found = limit
+    next_cursor = encode_run_cursor(run_df.iloc[end - 1]) if end < hi else None
+    return run_df.iloc[lo:end], next_cursor
+
+def iter_run_chunks(run_df, sport_type=None, columns=None, chunk_size=RUN_QUERY_CHUNK_SIZE):
+    """Yield run_df in bounded chunks, filtered by sport type and projected onto columns.
+
+    float32 columns are widened to float64 via their shortest repr (2.987, not
+    2.9869999886), so every export format writes the values as they came from the API.
+    """
+    for lo in range(0, len(run_df), chunk_size):
+        chunk = run_df.iloc[lo:lo + chunk_size]
+        if sport_type:
+            chunk = chunk[chunk["sport_type"] == sport_type]
+        if columns:
+            chunk = chunk[columns]
+        if not chunk.empty:
+            floats = chunk.select_dtypes("float32").columns
+            yield chunk.astype({c: str for c in floats}).astype({c: "float64" for c in floats})
+
+def build_metric_index(run_df):
+    """Sort each indexed metric once (NaNs dropped) so distribution queries can binary search."""
+    values = {}
+    for metric in INDEXED_METRICS:
+        column = pace_to_decimal(run_df[metric]) if metric == "pace" else run_df[metric]
+        column = column.to_numpy(dtype="float64", na_value=np.nan)
+        values[metric] = np.sort(column[~np.isnan(column)])
+    return {"count": len(run_df), "values": values}
+
+def get_metric_index(run_df, key=None):
+    """Return build_metric_index(run_df), cached under key for the frame's data version.
+
+    Frames without a data_version attr (e.g. fresh API reads) are indexed on every call.
+    """
+    version = run_df.attrs.get("data_version")
+    if key is None or version is None or run_df.empty:
+        return build_metric_index(run_df)
+    cached = _metric_index_cache.get(key)
+    if cached is None or cached[0] != version:
+        _metric_index_cache[key] = (version, build_metric_index(run_df))
+    return _metric_index_cache[key][1]
+
+def histogram_counts(sorted_values, edges):
+    """Bin counts matching np.histogram: half-open bins, with the last bin closed."""
+    positions = np.searchsorted(sorted_values, edges, side="left")
+    positions[-1] = np.searchsorted(sorted_values, edges[-1], side="right")
+    return np.diff(positions)
+
+def percentile_from_sorted(sorted_values, q):
+    """The q-th percentile (0-100) of sorted values, interpolated like np.percentile."""
+    if len(sorted_values) == 0:
+        return float("nan")
+    pos = (len(sorted_values) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return float(sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower))
+
+def fraction_below(sorted_values, threshold):
+    """Fraction of values strictly below threshold (e.g. runs faster than a pace)."""
+    if len(sorted_values) == 0:
+        return float("nan")
+    return np.searchsorted(sorted_values, threshold, side="left") / len(sorted_values)
 
 def get_summary_stats(run_df):
     """Calculate summary statistics for the run data"""
@@ -111,7 +285,7 @@ def get_summary_stats(run_df):
         'Total Distance (miles)': run_df['distance_mile'].sum(),
         'Total Moving Time (hours)': run_df['moving_time_minute'].sum() / 60,
         'Total Elevation Gain (ft)': run_df['total_elevation_gain_ft'].sum(),
-        'Average Pace (min/mile)': decimal_to_time(run_df['pace'].apply(time_to_decimal).mean()),
+        'Average Pace (min/mile)': decimal_to_time(pace_to_decimal(run_df['pace']).mean()),
         'Average Heart Rate (bpm)': run_df['average_heartrate'].mean(),
         'Average Watts': run_df['average_watts'].mean()
     }
@@ -15,7 +15,9 @@ from pathlib import Path
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from data import get_run_data, fetch_all_historical_run_data_and_save
+# store (not data) keeps pandas out of the collector, so restarts and --once runs start fast
+from store import HISTORICAL_RUN_DATA_PATH, fetch_all_historical_data_and_save, load_activities, sync_recent_activities
+from records import RECORDS_PATH, update_records
 
 # Set up logging
 logging.basicConfig(
@@ -33,12 +35,14 @@ def ensure_data_directory():
     data_dir.mkdir(exist_ok=True)
     return data_dir
 
-def collect_and_save_data(all_historical=False):
+def collect_and_save_data(all_historical=False, wait=True):
     """Collect Strava data and save to data folder.
 
     If all_historical is True, fetches all activities from API and overwrites
-    data/strava_run_data.csv (used by cycle distribution plots).
-    Otherwise fetches last 30 days and saves timestamped + latest copy.
+    the local store data/strava_activities.json (used by the dashboard and /api/runs).
+    Otherwise fetches the last 30 days and merges them into the store by activity id.
+    Without wait, indexing records stops at a spent rate-limit window instead of
+    sleeping until the next one (the rest stays pending for the next sync).
     """
     try:
         logging.info("Starting data collection...")
@@ -46,18 +50,18 @@ def collect_and_save_data(all_historical=False):
         ensure_data_directory()
 
         if all_historical:
-            logging.info("Fetching all historical run data from API...")
-            run_df = fetch_all_historical_run_data_and_save()
-            logging.info(f"Saved {len(run_df)} runs to data/strava_run_data.csv")
+            logging.info("Fetching all historical activity data from API...")
+            activities = fetch_all_historical_data_and_save()
+            logging.info(f"Saved {len(activities)} activities to {HISTORICAL_RUN_DATA_PATH}")
         else:
             read_date = datetime.now() - timedelta(days=30)
-            run_df = get_run_data(read_date)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_path = f"data/strava_run_data_{timestamp}.csv"
-            run_df.to_csv(file_path, index=False)
-            run_df.to_csv("data/strava_run_data.csv", index=False)
-            logging.info(f"Data saved: {file_path}")
-            logging.info(f"Collected {len(run_df)} runs")
+            fetched, added = sync_recent_activities(read_date)
+            logging.info(f"Data saved: {HISTORICAL_RUN_DATA_PATH}")
+            logging.info(f"Collected {fetched} activities ({added} new)")
+
+        # Personal records: index only runs not seen before (no reprocessing of history)
+        indexed = update_records(load_activities(), wait=wait)
+        logging.info(f"Indexed best efforts for {indexed} runs in {RECORDS_PATH}")
 
         return True
 
@@ -107,7 +111,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Strava Data Collection Agent")
     parser.add_argument("--once", action="store_true", help="Run data collection once and exit")
     parser.add_argument("--all", action="store_true", dest="all_historical",
-                        help="Fetch all historical data and save to data/strava_run_data.csv (for dashboard cycle plots)")
+                        help="Fetch all historical data and save to data/strava_activities.json (for dashboard cycle plots)")
     parser.add_argument("--interval", type=float, default=24, help="Collection interval in hours (default: 24)")
     parser.add_argument("--minutes", type=float, help="Collection interval in minutes (overrides --interval)")
 
@@ -116,6 +120,7 @@ if __name__ == "__main__":
     interval_hours = args.minutes / 60 if args.minutes else args.interval
 
     if args.once:
-        collect_and_save_data(all_historical=args.all_historical)
+        # A one-off run exits rather than sleeping through rate-limit windows
+        collect_and_save_data(all_historical=args.all_historical, wait=False)
     else:
         run_continuous_collection(interval_hours)
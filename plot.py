@@ -1,13 +1,53 @@
 """Plot the data"""
 
-import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from data import time_to_decimal
+from data import decimal_to_time, get_metric_index, histogram_counts, percentile_from_sorted, fraction_below
+from records import RECORD_DISTANCES
 
 # pylint: disable=C0301
 # pylint: disable=W0612
 
+# Default variables and their bin configurations (override bins per request in generate_plots)
+PLOT_VARIABLES = {
+    'distance_mile': {
+        'bins': [0, 3, 6, 9, 12, 15, 18, 20, float('inf')],
+        'labels': ['<3', '3-6', '6-9', '9-12', '12-15', '15-18', '18-20', '>20'],
+        'title': 'Distance (miles)',
+        'xlabel': 'Distance (miles)'
+    },
+    'moving_time_minute': {
+        'bins': [0, 30, 45, 60, 75, 90, 105, 120, float('inf')],
+        'labels': ['<30', '30-45', '45-60', '60-75', '75-90', '90-105', '105-120', '>120'],
+        'title': 'Moving Time (minutes)',
+        'xlabel': 'Time (minutes)'
+    },
+    'pace': {
+        'bins': [0, 7, 8, 9, 10, float('inf')],
+        'labels': ['<7', '7-8', '8-9', '9-10', '>10'],
+        'title': 'Pace (min/mile)',
+        'xlabel': 'Pace (min/mile)'
+    },
+    'total_elevation_gain_ft': {
+        'bins': [0, 50, 150, 250, 350, 450, 550, float('inf')],
+        'labels': ['<50', '50-150', '150-250', '250-350', '350-450', '450-550', '>550'],
+        'title': 'Elevation Gain (ft)',
+        'xlabel': 'Elevation (ft)'
+    },
+    'average_heartrate': {
+        'bins': [0, 140, 150, 160, 170, 180, float('inf')],
+        'labels': ['<140', '140-150', '150-160', '160-170', '170-180', '>180'],
+        'title': 'Average Heart Rate (bpm)',
+        'xlabel': 'Heart Rate (bpm)'
+    },
+    'average_watts': {
+        'bins': [0, 150, 160, 170, 180, 190, 200, 210, float('inf')],
+        'labels': ['<150', '150-160', '160-170', '170-180', '180-190', '190-200', '200-210', '>210'],
+        'title': 'Average Watts',
+        'xlabel': 'Watts'
+    }
+}
+
 def generate_summary(summary_stats: dict):
     """Generates the summary statistics HTML."""
     summary_html = f"""
@@ -22,8 +62,75 @@ def generate_summary(summary_stats: dict):
     """
     return summary_html
 
-def generate_plots(run_df):
-    """Generates the plot HTML."""
+def format_duration(seconds):
+    """Format seconds as H:MM:SS (or M:SS under an hour)."""
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+def generate_records_summary(period_records: dict, all_time_records: dict, pending: int = 0):
+    """Generates the personal records HTML: best per distance in the period, and all-time.
+
+    pending is the number of synced runs not indexed yet; while any remain the bests
+    may be incomplete, and the card says so.
+    """
+    summary_html = ""
+    if pending:
+        summary_html += f'<div class="metric"><em>Index incomplete: {pending} runs still pending.</em></div>\n'
+    if not all_time_records:
+        return summary_html + '<div class="metric">No best efforts indexed yet.</div>'
+    for name in RECORD_DISTANCES:
+        if name not in all_time_records:
+            continue
+        best = period_records.get(name)
+        period = f"{format_duration(best['elapsed_time'])} ({best['start_date_local'][:10]})" if best else "N/A"
+        all_time = format_duration(all_time_records[name]['elapsed_time'])
+        marker = " 🏅" if best and best['activity_id'] == all_time_records[name]['activity_id'] else ""
+        summary_html += f'<div class="metric"><strong>{name}:</strong> {period}{marker} · all-time {all_time}</div>\n'
+    return summary_html
+
+def bin_labels(edges, pace=False):
+    """Labels in the PLOT_VARIABLES style ('<3', '3-6', '>20') for a list of bin edges.
+
+    Pace edges (decimal minutes) are shown as MM:SS ('6:30-7:30').
+    """
+    fmt = decimal_to_time if pace else (lambda edge: f"{edge:g}")
+    labels = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if lo in (0, float('-inf')):
+            labels.append(f"<{fmt(hi)}")
+        elif hi == float('inf'):
+            labels.append(f">{fmt(lo)}")
+        else:
+            labels.append(f"{fmt(lo)}-{fmt(hi)}")
+    return labels
+
+def generate_distribution_summary(metric_index, percentiles=(25, 50, 75), faster_than=None):
+    """Generates the percentile (and optional faster-than-pace) HTML from a metric index."""
+    header = "/".join(f"p{q:g}" for q in percentiles)
+    summary_html = ""
+    for var, config in PLOT_VARIABLES.items():
+        sorted_values = metric_index['values'][var]
+        values = [percentile_from_sorted(sorted_values, q) for q in percentiles]
+        if var == 'pace':
+            shown = " / ".join(decimal_to_time(v) for v in values)
+        else:
+            shown = " / ".join(f"{v:.1f}" for v in values)
+        summary_html += f'<div class="metric"><strong>{config["title"]} {header}:</strong> {shown}</div>\n'
+    if faster_than is not None:
+        fraction = fraction_below(metric_index['values']['pace'], faster_than)
+        summary_html += (
+            f'<div class="metric"><strong>Runs faster than {decimal_to_time(faster_than)} min/mi:</strong> '
+            f'{fraction * 100:.1f}%</div>\n'
+        )
+    return summary_html
+
+def generate_plots(run_df, bins=None, metric_index=None):
+    """Generates the plot HTML.
+
+    bins maps a PLOT_VARIABLES key to custom bin edges; metric_index is a prebuilt
+    data.get_metric_index result, built here if not given.
+    """
 
     if run_df.empty:
         fig = go.Figure()
@@ -42,65 +149,29 @@ def generate_plots(run_df):
         )
         return fig
 
-    # Define the variables and their bin configurations
-    variables_config = {
-        'distance_mile': {
-            'bins': [0, 3, 6, 9, 12, 15, 18, 20, float('inf')],
-            'labels': ['<3', '3-6', '6-9', '9-12', '12-15', '15-18', '18-20', '>20'],
-            'title': 'Distance (miles)',
-            'xlabel': 'Distance (miles)'
-        },
-        'moving_time_minute': {
-            'bins': [0, 30, 45, 60, 75, 90, 105, 120, float('inf')],
-            'labels': ['<30', '30-45', '45-60', '60-75', '75-90', '90-105', '105-120', '>120'],
-            'title': 'Moving Time (minutes)',
-            'xlabel': 'Time (minutes)'
-        },
-        'pace': {
-            'bins': [0, 7, 8, 9, 10, float('inf')],
-            'labels': ['<7', '7-8', '8-9', '9-10', '>10'],
-            'title': 'Pace (min/mile)',
-            'xlabel': 'Pace (min/mile)'
-        },
-        'total_elevation_gain_ft': {
-            'bins': [0, 50, 150, 250, 350, 450, 550, float('inf')],
-            'labels': ['<50', '50-150', '150-250', '250-350', '350-450', '450-550', '>550'],
-            'title': 'Elevation Gain (ft)',
-            'xlabel': 'Elevation (ft)'
-        },
-        'average_heartrate': {
-            'bins': [0, 140, 150, 160, 170, 180, float('inf')],
-            'labels': ['<140', '140-150', '150-160', '160-170', '170-180', '>180'],
-            'title': 'Average Heart Rate (bpm)',
-            'xlabel': 'Heart Rate (bpm)'
-        },
-        'average_watts': {
-            'bins': [0, 150, 160, 170, 180, 190, 200, 210, float('inf')],
-            'labels': ['<150', '150-160', '160-170', '170-180', '180-190', '190-200', '200-210', '>210'],
-            'title': 'Average Watts',
-            'xlabel': 'Watts'
-        }
-    }
-
     # Create subplots
     fig = make_subplots(
         rows=2, cols=3,
-        subplot_titles=[config['title'] for config in variables_config.values()]
+        subplot_titles=[config['title'] for config in PLOT_VARIABLES.values()]
     )
 
     # Colors for the bars
     colors = ['skyblue', 'lightgreen', 'lightcoral', 'gold', 'plum', 'lightsteelblue']
-    for idx, (var, config) in enumerate(variables_config.items()):
+    bins = bins or {}
+    if metric_index is None:
+        metric_index = get_metric_index(run_df)
+    for idx, (var, config) in enumerate(PLOT_VARIABLES.items()):
         row = (idx // 3) + 1
         col = (idx % 3) + 1
 
-        plot_data = run_df[var].apply(time_to_decimal) if var == "pace" else run_df[var]
-        hist, bin_edges = np.histogram(plot_data, bins=config['bins'])
-        percentages = (hist / len(plot_data) * 100).round(1)
+        edges = bins.get(var, config['bins'])
+        labels = bin_labels(edges, pace=var == 'pace') if var in bins else config['labels']
+        hist = histogram_counts(metric_index['values'][var], edges)
+        percentages = (hist / metric_index['count'] * 100).round(1)
 
         fig.add_trace(
             go.Bar(
-                x=config['labels'],
+                x=labels,
                 y=hist,
                 name=config['title'],
                 marker_color=colors[idx],
@@ -0,0 +1,214 @@
+"""Personal records (best efforts) index, updated incrementally as activities sync"""
+
+import os
+import json
+import time
+import logging
+from cycles import CYCLE_OPTIONS
+from strava import (
+    StravaAPIError, get_activity, get_activity_streams, get_rate_limit_remaining, seconds_until_next_window
+)
+
+# pylint: disable=W1203
+
+# Local store of the index
+RECORDS_PATH = os.path.join("data", "strava_records.json")
+
+# Tracked distances (meters), named as in Strava's best_efforts
+RECORD_DISTANCES = {
+    "1K": 1000,
+    "1 mile": 1609.34,
+    "5K": 5000,
+    "10K": 10000,
+    "Half-Marathon": 21097.5,
+    "Marathon": 42195,
+}
+
+# Requests left untouched per (15-minute window, day) for the activity sync and the
+# dashboard, whose YTD views and /api/status each read a page of activities per 30 runs.
+# A backlog (e.g. after an --all sync) drains window by window until the daily budget is spent.
+RATE_LIMIT_RESERVE = (30, 300)
+# Save progress every N indexed runs, so new PRs show up while a backlog drains
+RECORDS_SAVE_EVERY = 25
+# Runs deleted or made private on Strava: indexed with no efforts so they are not refetched
+UNAVAILABLE_STATUSES = {403, 404}
+
+ALL_TIME_SCOPE = "All-time"
+
+# Loaded index per path: (file mtime, records)
+_records_cache = {}
+
+def cycle_bounds(cycles=None):
+    """Cycle name -> (start, end) as YYYY-MM-DD strings, inclusive."""
+    cycles = CYCLE_OPTIONS if cycles is None else cycles
+    return {
+        name: (opts["start_date"].strftime("%Y-%m-%d"), opts["end_date"].strftime("%Y-%m-%d"))
+        for name, opts in cycles.items()
+    }
+
+def effort_scopes(start_date_local, bounds):
+    """Scopes an effort counts toward: all-time, its calendar year, and any cycle containing it."""
+    day = start_date_local[:10]
+    scopes = [ALL_TIME_SCOPE, day[:4]]
+    scopes.extend(name for name, (start, end) in bounds.items() if start <= day <= end)
+    return scopes
+
+def empty_records(bounds):
+    """A new, empty index."""
+    return {"cycles": bounds, "activities": {}, "bests": {}, "pending": 0}
+
+def add_activity_efforts(records, activity_id, start_date_local, efforts):
+    """Record an activity's efforts ({distance name: seconds}) and update the bests it beats."""
+    records["activities"][str(activity_id)] = {"start_date_local": start_date_local, "efforts": efforts}
+    for scope in effort_scopes(start_date_local, records["cycles"]):
+        bests = records["bests"].setdefault(scope, {})
+        for name, elapsed_time in efforts.items():
+            if name not in bests or elapsed_time < bests[name]["elapsed_time"]:
+                bests[name] = {
+                    "activity_id": activity_id,
+                    "elapsed_time": elapsed_time,
+                    "start_date_local": start_date_local,
+                }
+
+def rebuild_bests(records, bounds):
+    """Recompute bests from the stored efforts (no API calls), e.g. after cycles change."""
+    rebuilt = empty_records(bounds)
+    for activity_id, activity in records["activities"].items():
+        add_activity_efforts(rebuilt, int(activity_id), activity["start_date_local"], activity["efforts"])
+    rebuilt["pending"] = records.get("pending", 0)
+    return rebuilt
+
+def load_records(filepath=None, cycles=None):
+    """Load the index, cached until the file changes. Returns an empty index if missing."""
+    path = filepath or RECORDS_PATH
+    bounds = cycle_bounds(cycles)
+    if not os.path.isfile(path):
+        return empty_records(bounds)
+    version = os.stat(path).st_mtime_ns
+    cached = _records_cache.get(path)
+    if cached is None or cached[0] != version:
+        with open(path, encoding='utf-8') as f:
+            records = json.load(f)
+        if records.get("cycles") != bounds:
+            records = rebuild_bests(records, bounds)
+        _records_cache[path] = (version, records)
+    return _records_cache[path][1]
+
+def save_records(records, filepath=None):
+    """Write the index atomically."""
+    path = filepath or RECORDS_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(file=tmp_path, mode='w', encoding='utf-8') as f:
+        json.dump(records, f)
+    os.replace(tmp_path, path)
+
+def get_personal_records(records, scope):
+    """Bests for a scope (ALL_TIME_SCOPE, a year like "2025", or a cycle name)."""
+    return records["bests"].get(scope, {})
+
+def efforts_from_best_efforts(best_efforts):
+    """Tracked distances from a detailed activity's best_efforts, as {name: elapsed seconds}."""
+    names = {name.lower(): name for name in RECORD_DISTANCES}
+    efforts = {}
+    for effort in best_efforts:
+        name = names.get(effort.get("name", "").lower())
+        if name and (name not in efforts or effort["elapsed_time"] < efforts[name]):
+            efforts[name] = effort["elapsed_time"]
+    return efforts
+
+def efforts_from_streams(times, distances):
+    """Fastest elapsed time over each tracked distance, from time/distance streams.
+
+    Two pointers: for each end sample, the start is the latest sample still at least
+    the target distance behind it.
+    """
+    efforts = {}
+    for name, target in RECORD_DISTANCES.items():
+        if not distances or distances[-1] - distances[0] < target:
+            continue
+        best, start = None, 0
+        for end, distance in enumerate(distances):
+            if distance - distances[0] < target:
+                continue
+            while distance - distances[start + 1] >= target:
+                start += 1
+            elapsed = times[end] - times[start]
+            if best is None or elapsed < best:
+                best = elapsed
+        efforts[name] = best
+    return efforts
+
+def fetch_activity_efforts(activity):
+    """Best efforts for a run: from the detailed activity, or computed from its streams."""
+    detail = get_activity(activity["id"])
+    if detail.get("best_efforts"):
+        return efforts_from_best_efforts(detail["best_efforts"])
+    if detail.get("manual"):
+        return {}  # no streams for manual entries
+    streams = get_activity_streams(activity["id"])
+    if "time" not in streams or "distance" not in streams:
+        return {}
+    return efforts_from_streams(streams["time"]["data"], streams["distance"]["data"])
+
+def wait_for_rate_limit(wait=True):
+    """Sleep until the next 15-minute window if this one's budget is spent (with wait).
+
+    Returns False when the daily budget is spent, or this window's without wait.
+    """
+    remaining = get_rate_limit_remaining()
+    if remaining is None:
+        return True
+    short_remaining, daily_remaining = remaining
+    short_reserve, daily_reserve = RATE_LIMIT_RESERVE
+    if daily_remaining <= daily_reserve:
+        logging.info("Daily rate limit spent, remaining runs are indexed on the next sync")
+        return False
+    if short_remaining <= short_reserve:
+        if not wait:
+            logging.info("Rate limit window spent, remaining runs are indexed on the next sync")
+            return False
+        seconds = seconds_until_next_window()
+        logging.info(f"Rate limit window spent, indexing records resumes in {seconds:.0f}s")
+        time.sleep(seconds)
+    return True
+
+def update_records(activities, filepath=None, wait=True):
+    """Index runs not yet in the records, newest first. Returns the number indexed.
+
+    Runs already indexed are never refetched. Fetching continues while Strava's rate
+    limit has budget beyond RATE_LIMIT_RESERVE, waiting out spent 15-minute windows
+    (stopping instead without wait); it stops when the daily budget is spent or on an
+    error that may clear later (429, 5xx, network), leaving the rest pending for the
+    next sync. Runs that are gone or private (403/404) are indexed with no efforts.
+    """
+    records = load_records(filepath)
+    pending = [
+        activity for activity in activities
+        if activity.get("type") == "Run" and str(activity["id"]) not in records["activities"]
+    ]
+    pending.sort(key=lambda a: a.get("start_date_local", ""), reverse=True)
+    indexed = 0
+    for activity in pending:
+        if not wait_for_rate_limit(wait):
+            break
+        try:
+            efforts = fetch_activity_efforts(activity)
+        except StravaAPIError as e:
+            if e.status_code not in UNAVAILABLE_STATUSES:
+                logging.warning(f"Stopped indexing records at activity {activity['id']}: {e}")
+                break
+            logging.info(f"Activity {activity['id']} is unavailable ({e.status_code}), indexed without efforts")
+            efforts = {}
+        except Exception as e:  # pylint: disable=W0718
+            logging.warning(f"Stopped indexing records at activity {activity['id']}: {e}")
+            break
+        add_activity_efforts(records, activity["id"], activity["start_date_local"], efforts)
+        indexed += 1
+        if indexed % RECORDS_SAVE_EVERY == 0:
+            records["pending"] = len(pending) - indexed
+            save_records(records, filepath)
+    if indexed or records.get("pending") != len(pending):
+        records["pending"] = len(pending) - indexed
+        save_records(records, filepath)
+    return indexed
@@ -0,0 +1,52 @@
+"""Local store of raw Strava activities (JSON), kept free of pandas so syncs start fast"""
+
+import json
+import os
+from datetime import datetime
+from strava import get_activities
+
+# Static file for historical run data (used by cycle distribution plots)
+HISTORICAL_RUN_DATA_PATH = os.path.join("data", "strava_activities.json")
+
+def load_activities(filepath=None):
+    """Load raw activities from the store. Returns an empty list if missing."""
+    path = filepath or HISTORICAL_RUN_DATA_PATH
+    if not os.path.isfile(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_activities(activities, filepath=None):
+    """Write activities to the store atomically, so readers never see a partial file."""
+    path = filepath or HISTORICAL_RUN_DATA_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(file=tmp_path, mode='w', encoding='utf-8') as f:
+        json.dump(activities, f, indent=2)
+    os.replace(tmp_path, path)
+
+def merge_activities(new_activities, filepath=None):
+    """Merge activities into the store by id (newer copies win). Returns the number added."""
+    merged = {activity["id"]: activity for activity in load_activities(filepath)}
+    existing = len(merged)
+    merged.update((activity["id"], activity) for activity in new_activities)
+    activities = sorted(merged.values(), key=lambda a: a.get("start_date_local", ""))
+    save_activities(activities, filepath)
+    return len(merged) - existing
+
+def sync_recent_activities(read_date, filepath=None):
+    """Fetch activities from read_date onward and merge them into the store.
+
+    Returns (fetched, added) activity counts.
+    """
+    activities = get_activities(after=read_date.timestamp())
+    added = merge_activities(activities, filepath)
+    return len(activities), added
+
+def fetch_all_historical_data_and_save(filepath=None):
+    """Fetch all activities from API and save to the store. Use for initial/periodic full sync."""
+    path = filepath or HISTORICAL_RUN_DATA_PATH
+    activities = get_activities(before=datetime.now().timestamp())
+    save_activities(activities, path)
+    print(f"Saved {len(activities)} activities to {path}")
+    return activities
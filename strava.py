@@ -2,9 +2,9 @@
 
 import os
 import json
+import time
 from datetime import datetime
 import requests
-import pandas as pd
 
 # CONFIGURATION
 CLIENT_ID = os.getenv("STRAVA_CLIENT_ID")
@@ -84,6 +84,7 @@ def get_activities(after=None, before=None, per_page=30):
             headers={'Authorization': f'Bearer {access_token}'},
             params=params, timeout=30
         )
+        _update_rate_limit(response)
         if response.status_code == 401:
             print("Access token expired, refreshing...")
             access_token = refresh_access_token()
@@ -102,8 +103,100 @@ def get_activities(after=None, before=None, per_page=30):
         page += 1
     return all_activities
 
+# STEP 5: GET ACTIVITY DETAILS (best efforts) AND STREAMS
+class StravaAPIError(RuntimeError):
+    """Non-200 response from the Strava API; status_code tells retryable errors apart."""
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+# Strava's short rate-limit window; it resets at :00, :15, :30 and :45 (the daily one at midnight UTC)
+RATE_LIMIT_WINDOW_SECONDS = 15 * 60
+
+# Last rate-limit headers seen, as [15-minute, daily] request counts: overall
+# (X-RateLimit-*) and for reads (X-ReadRateLimit-*, the tighter budget for GETs)
+rate_limit = {'limit': None, 'usage': None, 'read_limit': None, 'read_usage': None, 'time': None}
+
+RATE_LIMIT_HEADERS = (
+    ('limit', 'X-RateLimit-Limit'), ('usage', 'X-RateLimit-Usage'),
+    ('read_limit', 'X-ReadRateLimit-Limit'), ('read_usage', 'X-ReadRateLimit-Usage'),
+)
+
+def _update_rate_limit(response):
+    """Record the rate-limit headers of a Strava API response, if present."""
+    for key, header in RATE_LIMIT_HEADERS:
+        value = response.headers.get(header)
+        if value:
+            rate_limit[key] = [int(v) for v in value.split(',')[:2]]
+            rate_limit['time'] = time.time()
+
+def get_rate_limit_remaining():
+    """Requests left as (15-minute, daily), or None before any response reported them.
+
+    Each is the smaller of the overall and read budgets. Usage reported in an earlier
+    window (or UTC day) counts as reset.
+    """
+    now, seen = time.time(), rate_limit['time']
+    remaining = None
+    for limit_key, usage_key in (('limit', 'usage'), ('read_limit', 'read_usage')):
+        if rate_limit[limit_key] is None or rate_limit[usage_key] is None:
+            continue
+        short_usage, daily_usage = rate_limit[usage_key]
+        if now // RATE_LIMIT_WINDOW_SECONDS != seen // RATE_LIMIT_WINDOW_SECONDS:
+            short_usage = 0
+        if now // 86400 != seen // 86400:
+            daily_usage = 0
+        short_remaining = rate_limit[limit_key][0] - short_usage
+        daily_remaining = rate_limit[limit_key][1] - daily_usage
+        if remaining is not None:
+            short_remaining, daily_remaining = min(short_remaining, remaining[0]), min(daily_remaining, remaining[1])
+        remaining = (short_remaining, daily_remaining)
+    return remaining
+
+def seconds_until_next_window():
+    """Seconds until Strava's 15-minute rate-limit window resets (plus a second of slack)."""
+    return RATE_LIMIT_WINDOW_SECONDS - time.time() % RATE_LIMIT_WINDOW_SECONDS + 1
+
+def get_api_object(path, params=None):
+    """GET a single JSON object from the Strava API, refreshing the token once if expired."""
+    with open('strava_token.json', encoding='utf-8') as f:
+        tokens = json.load(f)
+    access_token = tokens.get('access_token')
+    for attempt in range(2):
+        response = requests.get(
+            f'https://www.strava.com/api/v3/{path}',
+            headers={'Authorization': f'Bearer {access_token}'},
+            params=params, timeout=30
+        )
+        _update_rate_limit(response)
+        if response.status_code == 401 and attempt == 0:
+            print("Access token expired, refreshing...")
+            access_token = refresh_access_token()
+            continue  # retry with new token
+        break
+    if response.status_code != 200:
+        try:
+            data = response.json()
+        except ValueError:
+            data = response.text
+        msg = data.get("message", str(data)) if isinstance(data, dict) else str(data)
+        raise StravaAPIError(f"Strava API error ({response.status_code}): {msg}", response.status_code)
+    return response.json()
+
+def get_activity(activity_id):
+    """Fetch a detailed activity (includes best_efforts for runs)."""
+    return get_api_object(f'activities/{activity_id}')
+
+def get_activity_streams(activity_id, keys=("time", "distance")):
+    """Fetch activity streams keyed by type, e.g. {"time": {"data": [...]}, ...}."""
+    return get_api_object(
+        f'activities/{activity_id}/streams',
+        params={'keys': ",".join(keys), 'key_by_type': 'true'}
+    )
+
 def main():
     """read activities"""
+    import pandas as pd  # pylint: disable=C0415
     read_date = datetime(2025, 6, 1)
     activities = get_activities(after=read_date.timestamp())
     df = pd.DataFrame(activities)